@@ -1,17 +1,29 @@
 import os
 import re
-import json
 import time
-import glob
 import asyncio
 import logging
-from datetime import datetime, timedelta
+import httpx
+import orjson
+import requests
+from operator import itemgetter
+from datetime import date, datetime, timedelta
 from dotenv import load_dotenv
 from rich.console import Console
 from colorlog import ColoredFormatter
+from diskcache import Cache
+from aiolimiter import AsyncLimiter
 from notion_client import AsyncClient
+from notion_client.errors import HTTPResponseError
+from urllib3.util.retry import Retry
+from requests.adapters import HTTPAdapter
 from logging.handlers import RotatingFileHandler
 
+try:
+    import uvloop
+except ImportError:  # uvloop não tem suporte ao Windows
+    uvloop = None
+
 # Configurações iniciais
 console = Console()
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -49,8 +61,10 @@ logger.addHandler(handler)
 logger.addHandler(console_handler)
 
 # Arquivos de cache
-PAGE_CACHE_FILE = os.path.join(caches_dir, "page_cache.json")
-MATERIA_CACHE_FILE = os.path.join(caches_dir, "materia_cache.json")
+PAGE_CACHE_DIR = os.path.join(caches_dir, "pages")
+MATERIA_CACHE_DIR = os.path.join(caches_dir, "materias")
+CACHE_TTL = 3 * 24 * 60 * 60  # Validade de cada entrada dos caches (3 dias)
+CACHE_SIZE_LIMIT = 16 * 1024 * 1024  # Acima disso, descarta os mais antigos
 LAST_MESSAGE_FILE = os.path.join(caches_dir, "last_message.json")
 
 # Carregar variáveis de ambiente
@@ -61,27 +75,54 @@ NOTION_DATABASE_ID = os.getenv("NOTION_DATABASE_ID")
 TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
 TELEGRAM_CHAT_ID_WPP = os.getenv("TELEGRAM_CHAT_ID_WPP")
 
-# Cliente Notion assíncrono
-notion = AsyncClient(auth=NOTION_API_KEY)
+# Cliente Notion assíncrono, com um único pool de conexões (keep-alive)
+# compartilhado por todas as requisições da execução
+http_client = httpx.AsyncClient(
+    limits=httpx.Limits(
+        max_connections=50, max_keepalive_connections=50, keepalive_expiry=60
+    )
+)
+notion = AsyncClient(auth=NOTION_API_KEY, client=http_client, timeout_ms=10_000)
+# Limita as buscas de páginas relacionadas simultâneas e a taxa de
+# requisições ao limite publicado pelo Notion (3 req/s)
+notion_semaphore = asyncio.Semaphore(8)
+notion_limiter = AsyncLimiter(3, 1)
+NOTION_MAX_ATTEMPTS = 5
+
+# Sessão HTTP do Telegram, reaproveitando a conexão entre os envios. Só
+# falhas de conexão são repetidas: repetir um POST de sendMessage que chegou
+# ao Telegram poderia publicar a mesma mensagem duas vezes
+telegram_session = requests.Session()
+telegram_session.mount(
+    "https://",
+    HTTPAdapter(
+        pool_connections=20,
+        pool_maxsize=20,
+        max_retries=Retry(total=3, backoff_factor=0.2),
+    ),
+)
 
 
 # Funções utilitárias de cache
-def check_and_update_cache(file_path, cache_name, max_age_days=1):
-    if os.path.exists(file_path):
-        mod_time = datetime.fromtimestamp(os.path.getmtime(file_path))
-        if (datetime.now() - mod_time).days > max_age_days:
-            logger.info(
-                f"Cache {cache_name} desatualizado (>{max_age_days} dia). Limpando."
-            )
-            return {}
-    return load_cache(file_path, cache_name)
+def open_cache(directory, cache_name):
+    # "least-recently-stored" não grava nada nas leituras (ao contrário do LRU)
+    cache = Cache(
+        directory,
+        size_limit=CACHE_SIZE_LIMIT,
+        eviction_policy="least-recently-stored",
+    )
+    expired = cache.expire()
+    logger.info(
+        f"Cache {cache_name} aberto em {directory} com {len(cache)} itens ({expired} expirados removidos)"
+    )
+    return cache
 
 
 def load_cache(file_path, cache_name):
     if os.path.exists(file_path):
         try:
-            with open(file_path, "r") as f:
-                cache = json.load(f)
+            with open(file_path, "rb") as f:
+                cache = orjson.loads(f.read())
                 logger.info(
                     f"Cache {cache_name} carregado de {file_path} com {len(cache)} itens"
                 )
@@ -93,26 +134,38 @@ def load_cache(file_path, cache_name):
 
 
 def save_cache(cache, file_path, cache_name):
+    # Grava em um arquivo temporário e o move para o lugar, para que uma
+    # interrupção no meio da escrita não deixe o cache corrompido
+    tmp_path = f"{file_path}.tmp"
     try:
-        with open(file_path, "w") as f:
-            json.dump(cache, f)
+        with open(tmp_path, "wb") as f:
+            f.write(orjson.dumps(cache))
+        os.replace(tmp_path, file_path)
         logger.info(f"Cache {cache_name} salvo em {file_path} com {len(cache)} itens")
     except Exception as e:
         logger.error(f"Erro ao salvar cache {cache_name} em {file_path}: {e}")
+        # Não deixa o temporário da escrita que falhou para trás
+        try:
+            os.remove(tmp_path)
+        except FileNotFoundError:
+            pass
 
 
 # Função para limpar logs antigos
 def clean_old_logs(max_age_days=7):
-    log_files = glob.glob("logs/notion_sync_*.log")
-    current_time = time.time()
-    for log_file in log_files:
-        file_time = os.path.getmtime(log_file)
-        if (current_time - file_time) > (max_age_days * 24 * 60 * 60):
-            try:
-                os.remove(log_file)
-                logger.info(f"Arquivo de log antigo removido: {log_file}")
-            except Exception as e:
-                logger.error(f"Erro ao remover log {log_file}: {e}")
+    cutoff = time.time() - max_age_days * 24 * 60 * 60
+    with os.scandir(logs_dir) as entries:
+        for entry in entries:
+            if not (
+                entry.name.startswith("notion_sync_") and entry.name.endswith(".log")
+            ):
+                continue
+            if entry.stat().st_mtime < cutoff:
+                try:
+                    os.remove(entry.path)
+                    logger.info(f"Arquivo de log antigo removido: {entry.path}")
+                except Exception as e:
+                    logger.error(f"Erro ao remover log {entry.path}: {e}")
 
 
 # Funções de interação com a API do Notion
@@ -126,107 +179,199 @@ async def check_notion_api():
         return False
 
 
-async def fetch_notion_data(database_id):
+async def call_notion(endpoint, **kwargs):
+    # Em caso de 429 ou 5xx, tenta novamente com backoff exponencial,
+    # respeitando o Retry-After quando o Notion o informa
+    for attempt in range(1, NOTION_MAX_ATTEMPTS + 1):
+        try:
+            async with notion_limiter:
+                return await endpoint(**kwargs)
+        except HTTPResponseError as e:
+            retryable = e.status == 429 or e.status >= 500
+            if not retryable or attempt == NOTION_MAX_ATTEMPTS:
+                raise
+            delay = float(e.headers.get("Retry-After", min(30, 2**attempt)))
+            logger.warning(
+                "Notion respondeu %s (tentativa %s/%s). Aguardando %ss...",
+                e.status,
+                attempt,
+                NOTION_MAX_ATTEMPTS,
+                delay,
+            )
+        await asyncio.sleep(delay)
+
+
+def build_pending_filter():
+    # Pré-filtra no Notion as tarefas não concluídas com entrega próxima, para
+    # não baixar nem resolver relações de linhas que seriam descartadas. A
+    # janela tem um dia de folga em cada ponta (datas com horário e fuso); o
+    # filtro exato de 0 a 7 dias continua sendo aplicado localmente
+    return {
+        "and": [
+            {"property": "Status", "select": {"does_not_equal": "Concluído"}},
+            {
+                "property": "Data de Entrega",
+                "date": {"on_or_after": (today - timedelta(days=1)).isoformat()},
+            },
+            {
+                "property": "Data de Entrega",
+                "date": {"on_or_before": (today + timedelta(days=8)).isoformat()},
+            },
+        ]
+    }
+
+
+async def fetch_notion_data(database_id, relation_caches, query_filter):
+    # As relações de cada página da consulta são buscadas em segundo plano
+    # enquanto a próxima é requisitada, escondendo a latência da paginação
     all_results = []
+    tasks = []
     try:
-        response = await notion.databases.query(database_id=database_id)
-        all_results.extend(response["results"])
-        while response.get("has_more"):
-            response = await notion.databases.query(
-                database_id=database_id, start_cursor=response["next_cursor"]
-            )
+        response = await call_notion(
+            notion.databases.query, database_id=database_id, filter=query_filter
+        )
+        while True:
             all_results.extend(response["results"])
+            tasks.append(
+                asyncio.create_task(
+                    prefetch_relations(response["results"], relation_caches)
+                )
+            )
+            if not response.get("has_more"):
+                break
+            response = await call_notion(
+                notion.databases.query,
+                database_id=database_id,
+                filter=query_filter,
+                start_cursor=response["next_cursor"],
+            )
         logger.info(f"Dados obtidos do Notion: {len(all_results)} itens")
+        await asyncio.gather(*tasks)
         return all_results
     except Exception as e:
+        for task in tasks:
+            task.cancel()
         logger.error(f"Erro ao buscar dados do Notion: {e}")
         raise
 
 
-async def get_notion_page(page_id, cache):
-    if page_id in cache:
-        logger.debug(f"Cache hit para página {page_id}")
-        return cache[page_id]
+async def prefetch_relations(results, relation_caches):
+    # Reúne os IDs de relação ainda fora do cache e busca cada um uma única
+    # vez, mesmo que vários resultados apontem para a mesma página
+    missing = {}
+    for result in results:
+        props = result.get("properties")
+        for prop_name, cache in relation_caches.items():
+            for rel_id in extract_relation_ids(props, prop_name):
+                if rel_id not in cache:
+                    missing[prop_name, rel_id] = cache
+    pages = await asyncio.gather(*(get_notion_page(rel_id) for _, rel_id in missing))
+    for ((_, rel_id), cache), page_data in zip(missing.items(), pages):
+        title = extract_title(page_data.get("properties"), "Name")
+        if title:
+            cache.set(rel_id, title, expire=CACHE_TTL)
+            logger.debug("Relação %s cached: %s", rel_id, title)
+
+
+# Requisições de página da execução, em andamento ou já resolvidas, para que
+# cada ID seja buscado uma única vez mesmo entre páginas diferentes da consulta
+# (o título só vai para o cache depois que o gather do lote inteiro termina)
+_inflight = {}
+
+
+async def get_notion_page(page_id):
+    if page_id in _inflight:
+        logger.debug("Aguardando requisição em andamento da página %s", page_id)
+        return await _inflight[page_id]
+    future = asyncio.get_running_loop().create_future()
+    _inflight[page_id] = future
     try:
-        page = await notion.pages.retrieve(page_id=page_id)
-        cache[page_id] = page
-        logger.debug(f"Página {page_id} carregada e adicionada ao cache")
-        return page
+        async with notion_semaphore:
+            page = await call_notion(notion.pages.retrieve, page_id=page_id)
+        logger.debug("Página %s carregada", page_id)
     except Exception as e:
-        logger.warning(f"Falha ao buscar página {page_id}: {e}")
-        return {}
+        logger.warning("Falha ao buscar página %s: %s", page_id, e)
+        page = {}
+    except asyncio.CancelledError:
+        # Cancelada, a página pode ser pedida de novo
+        del _inflight[page_id]
+        future.cancel()
+        raise
+    future.set_result(page)
+    return page
 
 
 # Funções de extração de dados do Notion
 def extract_title(props, prop_name):
     try:
-        return (
-            props.get(prop_name, {}).get("title", [{}])[0].get("plain_text", "").strip()
-        )
-    except (IndexError, AttributeError):
-        logger.debug(f"Erro ao extrair título de '{prop_name}'")
+        return props[prop_name]["title"][0]["plain_text"].strip()
+    except (KeyError, IndexError, TypeError, AttributeError):
+        logger.debug("Erro ao extrair título de '%s'", prop_name)
         return ""
 
 
 def extract_select(props, prop_name):
-    return props.get(prop_name, {}).get("select", {}).get("name", "") or ""
+    # "select" vem como null quando a propriedade está vazia
+    try:
+        return props[prop_name]["select"]["name"] or ""
+    except (KeyError, TypeError):
+        return ""
 
 
-async def extract_relation_titles(props, prop_name, cache):
-    relations = props.get(prop_name, {}).get("relation", [])
-    if not relations:
-        return ""
-    titles = []
-    for rel in relations:
-        rel_id = rel["id"]
-        if rel_id in cache:
-            logger.debug(f"Cache hit para relação {rel_id}")
-            titles.append(cache[rel_id])
-        else:
-            try:
-                page_data = await get_notion_page(rel_id, cache)
-                title = extract_title(page_data.get("properties", {}), "Name")
-                if title:
-                    cache[rel_id] = title
-                    logger.debug(f"Relação {rel_id} cached: {title}")
-                    titles.append(title)
-            except Exception as e:
-                logger.debug(f"Erro ao processar relação {rel_id}: {e}")
-    return ", ".join(titles) or "Nenhuma relação encontrada"
+def extract_relation_ids(props, prop_name):
+    try:
+        return [rel["id"] for rel in props[prop_name]["relation"]]
+    except (KeyError, TypeError):
+        return []
+
+
+def extract_relation_titles(props, prop_name, cache):
+    rel_ids = extract_relation_ids(props, prop_name)
+    if not rel_ids:
+        return []
+    titles = [cache.get(rel_id) for rel_id in rel_ids]
+    return [title for title in titles if title] or ["Nenhuma relação encontrada"]
 
 
 def extract_date(props, prop_name):
     if props is None:
-        logger.debug(f"Propriedades ausentes ao tentar extrair '{prop_name}'")
+        logger.debug("Propriedades ausentes ao tentar extrair '%s'", prop_name)
+        return ""
+    try:
+        return props[prop_name]["date"]["start"]
+    except (KeyError, TypeError):
         return ""
-    return props.get(prop_name, {}).get("date", {}).get("start", "")
 
 
 def extract_rich_text(props, prop_name):
-    rich_text = props.get(prop_name, {}).get("rich_text", [])
-    return rich_text[0].get("text", {}).get("content", "") if rich_text else ""
+    try:
+        return props[prop_name]["rich_text"][0]["text"]["content"]
+    except (KeyError, IndexError, TypeError):
+        return ""
 
 
 # Funções de processamento de dados
-today = datetime.today().replace(hour=0, minute=0, second=0, microsecond=0)
+today = date.today()
+_today_ord = today.toordinal()
 
 
 def calculate_days_remaining(entrega_date):
     if not entrega_date:
         return None
     try:
-        entrega_dt = datetime.fromisoformat(entrega_date)
-        return (entrega_dt - today).days
+        # Apenas o dia importa; ignora um eventual horário da data do Notion
+        return date.fromisoformat(entrega_date[:10]).toordinal() - _today_ord
     except ValueError as e:
-        logger.error(f"Erro ao calcular dias restantes para '{entrega_date}': {e}")
+        logger.error("Erro ao calcular dias restantes para '%s': %s", entrega_date, e)
         return None
 
 
-async def process_result(result, page_cache, materia_cache):
+def process_result(result, page_cache, materia_cache):
     props = result.get("properties")
     if props is None:
         logger.error(
-            f"Resultado inválido do Notion: 'properties' é None para {result.get('id', 'ID desconhecido')}"
+            "Resultado inválido do Notion: 'properties' é None para %s",
+            result.get("id", "ID desconhecido"),
         )
         return {
             "Professor": "",
@@ -237,7 +382,7 @@ async def process_result(result, page_cache, materia_cache):
             "Entrega": "",
             "Dias Restantes": None,
             "Descrição": "",
-            "Tópicos": "",
+            "Tópicos": [],
         }
     entrega_date = extract_date(props, "Data de Entrega")
     return {
@@ -245,72 +390,80 @@ async def process_result(result, page_cache, materia_cache):
         "Status": extract_select(props, "Status"),
         "Tipo": extract_select(props, "Tipo"),
         "Estágio": extract_select(props, "Estágio"),
-        "Matéria": await extract_relation_titles(props, "Matéria", materia_cache),
+        "Matéria": ", ".join(extract_relation_titles(props, "Matéria", materia_cache)),
         "Entrega": entrega_date,
         "Dias Restantes": calculate_days_remaining(entrega_date),
         "Descrição": extract_rich_text(props, "Descrição"),
-        "Tópicos": await extract_relation_titles(props, "Tópicos", page_cache),
+        "Tópicos": extract_relation_titles(props, "Tópicos", page_cache),
     }
 
 
-async def process_batch(batch, page_cache, materia_cache):
-    tasks = [process_result(result, page_cache, materia_cache) for result in batch]
-    return await asyncio.gather(*tasks)
+# Funções de formatação de mensagem
+_MESES = (
+    None,
+    "Janeiro",
+    "Fevereiro",
+    "Março",
+    "Abril",
+    "Maio",
+    "Junho",
+    "Julho",
+    "Agosto",
+    "Setembro",
+    "Outubro",
+    "Novembro",
+    "Dezembro",
+)
 
 
-# Funções de formatação de mensagem
 def formatar_data(data_str):
-    meses = {
-        1: "Janeiro",
-        2: "Fevereiro",
-        3: "Março",
-        4: "Abril",
-        5: "Maio",
-        6: "Junho",
-        7: "Julho",
-        8: "Agosto",
-        9: "Setembro",
-        10: "Outubro",
-        11: "Novembro",
-        12: "Dezembro",
-    }
-    data = datetime.strptime(data_str, "%Y-%m-%d")
-    dia = data.day
-    mes = meses[data.month]
-    return f"{dia} de {mes}"
+    data = date.fromisoformat(data_str[:10])
+    return f"{data.day} de {_MESES[data.month]}"
+
+
+# Caracteres reservados do MarkdownV2 do Telegram, escapados em uma única passada
+_MDV2_RE = re.compile(r"[_*\[\]()~`>#+\-=|{}.!]")
+
+
+def _escapar_caractere(match):
+    return "\\" + match[0]
 
 
 def escapar_markdown_v2(texto):
-    caracteres_reservados = [
-        "_",
-        "*",
-        "[",
-        "]",
-        "(",
-        ")",
-        "~",
-        "`",
-        ">",
-        "#",
-        "+",
-        "-",
-        "=",
-        "|",
-        "{",
-        "}",
-        ".",
-        "!",
-    ]
-    for char in caracteres_reservados:
-        texto = texto.replace(char, f"\\{char}")
-    return texto
+    return _MDV2_RE.sub(_escapar_caractere, texto)
+
+
+# O Telegram rejeita mensagens acima de 4096 caracteres; a margem cobre
+# o bloco de código adicionado na versão para WhatsApp
+TELEGRAM_MAX_CHARS = 3800
+
+
+def _cortar_markdown_v2(texto, limite):
+    # Corta um texto já escapado para caber em `limite` caracteres, sem separar
+    # a barra do caractere que ela escapa, terminando em reticências
+    if len(texto) <= limite:
+        return texto
+    cortado = texto[: max(limite - 1, 0)]
+    if cortado.endswith("\\"):
+        cortado = cortado[:-1]
+    return cortado + "…"
+
+
+def _montar_mensagem(tipo, materia, dias_texto, data_formatada, topicos, descricao):
+    return "\n".join(
+        (
+            f"*{tipo} \\- {materia}*",
+            f"Dias Restantes: *{dias_texto}*",
+            f"Entrega: `{data_formatada}`",
+            "Tópicos:",
+            *(f"\\- _{topico}_" for topico in topicos),
+            f"Descrição: _{descricao}_",
+        )
+    )
 
 
 def gerar_mensagem_tarefa(tarefa):
     dias_restantes = tarefa.get("Dias Restantes")
-    if dias_restantes > 7:
-        return None
-
     tipo = tarefa.get("Tipo", "N/D").upper()
     materia = tarefa.get("Matéria", "N/D")
     entrega = tarefa.get("Entrega", "N/D")
@@ -319,43 +472,92 @@ def gerar_mensagem_tarefa(tarefa):
     tipo = escapar_markdown_v2(tipo)
     materia = escapar_markdown_v2(materia)
     descricao = escapar_markdown_v2(descricao)
-    topicos = tarefa.get("Tópicos") or "Sem Tópicos"
+    topicos = [
+        escapar_markdown_v2(topico)
+        for topico in tarefa.get("Tópicos") or ["Sem Tópicos"]
+    ]
 
-    topicos_formatados = "\n".join(
-        [
-            f"\\- _{escapar_markdown_v2(topico.strip())}_"
-            for topico in topicos.split(", ")
-        ]
-    )
+    if dias_restantes == 0:
+        dias_texto = "🚨 HOJE 🚨"
+    elif dias_restantes == 1:
+        dias_texto = "1 DIA"
+    else:
+        dias_texto = f"{dias_restantes} DIAS"
 
-    dias_texto = (
-        "🚨 HOJE 🚨"
-        if dias_restantes == 0
-        else f"{dias_restantes} DIA{'S' if dias_restantes > 1 else ''}"
+    mensagem = _montar_mensagem(
+        tipo, materia, dias_texto, data_formatada, topicos, descricao
     )
-
-    mensagem = (
-        f"*{tipo} \\- {materia}*\n"
-        f"Dias Restantes: *{dias_texto}*\n"
-        f"Entrega: `{data_formatada}`\n"
-        f"Tópicos:\n{topicos_formatados}\n"
-        f"Descrição: _{descricao}_"
+    if len(mensagem) <= TELEGRAM_MAX_CHARS:
+        return mensagem
+
+    # Uma única tarefa não cabe em um envio: corta primeiro a descrição; se
+    # não bastar, remove os últimos tópicos e, por fim, encurta o tópico que
+    # sobrou e a matéria
+    logger.warning(
+        "Mensagem da tarefa '%s - %s' tem %s caracteres (limite %s). Truncando.",
+        tarefa.get("Tipo", "N/D"),
+        tarefa.get("Matéria", "N/D"),
+        len(mensagem),
+        TELEGRAM_MAX_CHARS,
     )
+    excesso = len(mensagem) - TELEGRAM_MAX_CHARS
+    descricao = _cortar_markdown_v2(descricao, max(len(descricao) - excesso, 1))
+    mensagem = _montar_mensagem(
+        tipo, materia, dias_texto, data_formatada, topicos, descricao
+    )
+    mantidos = list(topicos)
+    while len(mensagem) > TELEGRAM_MAX_CHARS and len(mantidos) > 1:
+        mantidos.pop()
+        topicos = mantidos + ["…"]
+        mensagem = _montar_mensagem(
+            tipo, materia, dias_texto, data_formatada, topicos, descricao
+        )
+    if len(mensagem) > TELEGRAM_MAX_CHARS:
+        excesso = len(mensagem) - TELEGRAM_MAX_CHARS
+        topicos[0] = _cortar_markdown_v2(topicos[0], max(len(topicos[0]) - excesso, 1))
+        mensagem = _montar_mensagem(
+            tipo, materia, dias_texto, data_formatada, topicos, descricao
+        )
+    if len(mensagem) > TELEGRAM_MAX_CHARS:
+        excesso = len(mensagem) - TELEGRAM_MAX_CHARS
+        materia = _cortar_markdown_v2(materia, max(len(materia) - excesso, 1))
+        mensagem = _montar_mensagem(
+            tipo, materia, dias_texto, data_formatada, topicos, descricao
+        )
     return mensagem
 
 
+_ESC_RE = re.compile(r"\\(.)")
+
+
 def print_whatsapp_markdown(mensagem):
-    return re.sub(r"\\(.)", r"\1", mensagem)
+    return _ESC_RE.sub(r"\1", mensagem)
+
+
+def agrupar_mensagens(mensagens, separador, limite=TELEGRAM_MAX_CHARS):
+    # Junta as mensagens em blocos que caibam em um único envio, sem quebrar
+    # uma tarefa entre dois blocos
+    blocos = []
+    atual = []
+    tamanho = 0
+    for mensagem in mensagens:
+        extra = len(separador) + len(mensagem) if atual else len(mensagem)
+        if atual and tamanho + extra > limite:
+            blocos.append(separador.join(atual))
+            atual, tamanho, extra = [], 0, len(mensagem)
+        atual.append(mensagem)
+        tamanho += extra
+    if atual:
+        blocos.append(separador.join(atual))
+    return blocos
 
 
 # Funções de interação com Telegram
 def delete_previous_message(chat_id, message_id):
-    import requests
-
     url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/deleteMessage"
     payload = {"chat_id": chat_id, "message_id": message_id}
     try:
-        response = requests.post(url, json=payload)
+        response = telegram_session.post(url, json=payload)
         if response.status_code == 200:
             logger.info(f"Mensagem anterior (ID: {message_id}) apagada com sucesso!")
         else:
@@ -367,19 +569,17 @@ def delete_previous_message(chat_id, message_id):
 
 
 def enviar_mensagem_telegram(mensagem, t_chat_id=TELEGRAM_CHAT_ID, parse_mode=None):
-    import requests
-
     url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
     payload = {"chat_id": t_chat_id, "text": mensagem}
     if parse_mode:
         payload["parse_mode"] = parse_mode
     try:
-        response = requests.post(url, json=payload)
+        response = telegram_session.post(url, json=payload)
         if response.status_code == 200:
             logger.info(
                 f"Mensagem enviada ao Telegram (chat id {t_chat_id}) com sucesso!"
             )
-            return response.json()["result"]["message_id"]
+            return orjson.loads(response.content)["result"]["message_id"]
         logger.error(
             f"chat id {t_chat_id} - Erro ao enviar mensagem: {response.status_code} - {response.text}"
         )
@@ -389,6 +589,17 @@ def enviar_mensagem_telegram(mensagem, t_chat_id=TELEGRAM_CHAT_ID, parse_mode=No
         return None
 
 
+def enviar_blocos_telegram(blocos, t_chat_id=TELEGRAM_CHAT_ID, parse_mode=None):
+    message_ids = []
+    for i, bloco in enumerate(blocos):
+        if i:
+            time.sleep(1)  # Espaça os envios para o rate limit do Telegram
+        message_id = enviar_mensagem_telegram(bloco, t_chat_id, parse_mode)
+        if message_id:
+            message_ids.append(message_id)
+    return message_ids
+
+
 # Função principal ajustada para remover Polars
 async def main():
     logger.info("Iniciando programa e checando API do Notion...")
@@ -403,47 +614,46 @@ async def main():
     logger.info("Variáveis de ambiente carregadas e API validada com sucesso!")
 
     # Carregar caches
-    page_cache = check_and_update_cache(PAGE_CACHE_FILE, "page_cache", max_age_days=3)
-    materia_cache = check_and_update_cache(
-        MATERIA_CACHE_FILE, "materia_cache", max_age_days=3
-    )
+    page_cache = open_cache(PAGE_CACHE_DIR, "page_cache")
+    materia_cache = open_cache(MATERIA_CACHE_DIR, "materia_cache")
     last_message_info = load_cache(LAST_MESSAGE_FILE, "last_message")
 
     # Obter e processar dados
-    logger.info("Iniciando requisição ao Notion...")
-    results = await fetch_notion_data(NOTION_DATABASE_ID)
-    logger.info("Dados obtidos com sucesso! Processando...")
-
-    batch_size = 50
-    batches = [results[i : i + batch_size] for i in range(0, len(results), batch_size)]
-    all_rows = []
-
-    for batch in batches:
-        processed_batch = await process_batch(batch, page_cache, materia_cache)
-        all_rows.extend(processed_batch)
+    try:
+        logger.info("Iniciando requisição ao Notion...")
+        results = await fetch_notion_data(
+            NOTION_DATABASE_ID,
+            {"Matéria": materia_cache, "Tópicos": page_cache},
+            build_pending_filter(),
+        )
+        logger.info("Dados obtidos com sucesso! Processando...")
+        all_rows = [
+            process_result(result, page_cache, materia_cache) for result in results
+        ]
+    finally:
+        await notion.aclose()
+        # Os caches em disco persistem a cada escrita; basta fechá-los
+        page_cache.close()
+        materia_cache.close()
 
     logger.info("Processamento concluído! Filtrando e ordenando dados...")
 
     # Filtrar e ordenar sem Polars
-    filtered_rows = []
-    for row in all_rows:
-        dias_restantes = row["Dias Restantes"]
-        status = row["Status"]
-        # Filtro: exclui "Concluído" e mantém apenas tarefas de 0 a 7 dias restantes
-        if (
-            status != "Concluído"
-            and dias_restantes is not None
-            and 0 <= dias_restantes <= 7
-        ):
-            filtered_rows.append(row)
-
-    # Ordenar por "Dias Restantes" (nulls_last=True)
-    filtered_rows.sort(key=lambda x: (x["Dias Restantes"] is None, x["Dias Restantes"]))
-
-    # Salvar caches e limpar logs
+    # Filtro: exclui "Concluído" e mantém apenas tarefas de 0 a 7 dias restantes.
+    # Após o filtro não há mais nulos, então a ordenação usa só "Dias Restantes"
+    filtered_rows = sorted(
+        (
+            row
+            for row in all_rows
+            if row["Status"] != "Concluído"
+            and row["Dias Restantes"] is not None
+            and 0 <= row["Dias Restantes"] <= 7
+        ),
+        key=itemgetter("Dias Restantes"),
+    )
+
+    # Limpar logs
     clean_old_logs(max_age_days=7)
-    save_cache(page_cache, PAGE_CACHE_FILE, "page_cache")
-    save_cache(materia_cache, MATERIA_CACHE_FILE, "materia_cache")
 
     # Gerar e enviar mensagens
     tarefas = filtered_rows  # Já é uma lista de dicionários
@@ -452,31 +662,34 @@ async def main():
             "Variáveis 'TELEGRAM_BOT_TOKEN', 'TELEGRAM_CHAT_ID' e 'TELEGRAM_CHAT_ID_WPP' não definidas!"
         )
 
+    # As tarefas já chegam filtradas (0 a 7 dias), então todas geram mensagem
     mensagens = [gerar_mensagem_tarefa(tarefa) for tarefa in tarefas]
-    mensagens_validas = [msg for msg in mensagens if msg is not None]
 
-    if mensagens_validas:
+    if mensagens:
         separador = "\n\n*\\-\\-\\-\\-\\-\\-*\n\n"
-        mensagem_conjunta = separador.join(mensagens_validas)
+        blocos = agrupar_mensagens(mensagens, separador)
         current_date = datetime.now().strftime("%Y-%m-%d")
-        if (
-            last_message_info.get("date") == current_date
-            and "message_id" in last_message_info
-        ):
-            delete_previous_message(TELEGRAM_CHAT_ID, last_message_info["message_id"])
-
-        message_id = enviar_mensagem_telegram(
-            mensagem_conjunta, parse_mode="MarkdownV2"
-        )
-        if message_id:
-            last_message_info = {"message_id": message_id, "date": current_date}
+        if last_message_info.get("date") == current_date:
+            # "message_id" é o formato antigo do cache, de uma única mensagem
+            previous_ids = last_message_info.get("message_ids") or [
+                last_message_info.get("message_id")
+            ]
+            for message_id in filter(None, previous_ids):
+                delete_previous_message(TELEGRAM_CHAT_ID, message_id)
+
+        message_ids = enviar_blocos_telegram(blocos, parse_mode="MarkdownV2")
+        if message_ids:
+            last_message_info = {"message_ids": message_ids, "date": current_date}
             save_cache(last_message_info, LAST_MESSAGE_FILE, "last_message")
 
-        mensagem_wpp_bc = f"```md\n{print_whatsapp_markdown(mensagem_conjunta)}```"
-        enviar_mensagem_telegram(
-            mensagem_wpp_bc, TELEGRAM_CHAT_ID_WPP, parse_mode="Markdown"
+        blocos_wpp = [print_whatsapp_markdown(bloco) for bloco in blocos]
+        enviar_blocos_telegram(
+            [f"```md\n{bloco}```" for bloco in blocos_wpp],
+            TELEGRAM_CHAT_ID_WPP,
+            parse_mode="Markdown",
         )
-        logger.debug(print_whatsapp_markdown(mensagem_conjunta))
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(print_whatsapp_markdown(separador).join(blocos_wpp))
         logger.info("Mensagem compatível com WhatsApp enviada!")
     else:
         logger.info(
@@ -485,4 +698,5 @@ async def main():
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    # uvloop acelera o loop de eventos quando disponível
+    (uvloop.run if uvloop else asyncio.run)(main())